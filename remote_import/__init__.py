@@ -1,4 +1,4 @@
-from .remote_importer import RemoteImporter  # noqa
+from .remote_importer import RemoteImporter, RemoteImporterRegistry  # noqa
 from .version import __version__
 
 version = __version__
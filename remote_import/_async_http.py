@@ -0,0 +1,30 @@
+"""Conditional HTTP downloads (ETag), on the aiohttp session of a fsspec HTTPFileSystem."""
+from typing import Optional, Tuple
+
+
+async def _conditional_get(session, url, etag, **kwargs):
+    if etag:
+        kwargs["headers"] = {**kwargs.get("headers", {}), "If-None-Match": etag}
+    async with session.get(url, **kwargs) as response:
+        if response.status == 304:
+            return None, etag
+        if response.status == 404:
+            raise FileNotFoundError(url)
+        response.raise_for_status()
+        return await response.read(), response.headers.get("ETag")
+
+
+def conditional_get(fs, url: str, etag: str = None) -> Tuple[Optional[bytes], Optional[str]]:
+    """GET url with If-None-Match, using the aiohttp session of a fsspec HTTPFileSystem.
+
+    The per-request options of the filesystem (fs.kwargs, e.g. headers or auth) are sent
+    as well, like HTTPFileSystem.cat does.
+    Returns (content, etag). content is None when the server answered 304 Not Modified.
+    """
+    from fsspec.asyn import sync
+
+    async def _get():
+        session = await fs.set_session()
+        return await _conditional_get(session, fs.encode_url(url), etag, **fs.kwargs)
+
+    return sync(fs.loop, _get)
@@ -16,28 +16,29 @@ Usage:
 >> obj = SomeUselessClass()
 
 """
-import os
+import posixpath
 import re
 import sys
 import types
 import importlib
-import traceback
-import fsspec
 from importlib.abc import MetaPathFinder
 from importlib.machinery import ModuleSpec
 from importlib.util import LazyLoader
-from typing import List, AnyStr
+from typing import AnyStr, Dict, List, Tuple
 import logging
 
 logger = logging.getLogger("remote_import")
 
+_VALID_VAR_RE = re.compile(r"\W|^(?=\d)")
+_SANITIZE_URL_RE = re.compile(r"([^:]/)(/)+")
+
 
 def validate_variable_string(variable_string):
-    return re.sub(r"\W|^(?=\d)", "_", variable_string)
+    return _VALID_VAR_RE.sub("_", variable_string)
 
 
 def sanitize_url(url):
-    return re.sub(r"([^:]/)(/)+", r"\1", url)
+    return _SANITIZE_URL_RE.sub(r"\1", url)
 
 
 class RemoteImporter(MetaPathFinder, LazyLoader):
@@ -49,62 +50,192 @@ class RemoteImporter(MetaPathFinder, LazyLoader):
     3. exec_module(module) --> return the module
     """
 
-    def __init__(self, namespace: str, base_url: str, headers: dict = {}, extra_args: dict = {}):
+    # url -> (source, code): latest compiled code of each module, shared by all importers,
+    # so reloading a module whose source did not change does not compile it again.
+    _code_cache: Dict[str, Tuple[str, types.CodeType]] = {}
+
+    def __init__(
+        self,
+        namespace: str,
+        base_url: str,
+        headers: dict = {},
+        extra_args: dict = {},
+        prefetch: bool = False,
+        backend: str = "fsspec",
+    ):
+        if backend not in ("fsspec", "obstore"):
+            raise ValueError(f"parameter 'backend' must be 'fsspec' or 'obstore', got '{backend}'")
         self.namespace = namespace
+        self.package_name = namespace
+        self.extra_args = extra_args
+        self.prefetch = prefetch
+        self.backend = backend
+        # module names in the order their execution completed (dependencies first),
+        # which is the order used to reload them
+        self._loaded_modules: Dict[str, None] = {}
+        # url -> (etag, source). Not cleared on reload: it is what makes reload cheap
+        self._etag_cache: Dict[str, Tuple[str, str]] = {}
+        self._reset(base_url, headers)
+        if backend == "obstore" and not self._is_http:
+            logger.warning(f"backend 'obstore' is only used for HTTP, using fsspec for {self.namespace_url}")
+
+    def _reset(self, base_url: str, headers: dict):
+        # (Re)set everything derived from base_url and headers, dropping the cached remote state
         self.base_url = base_url
+        # sanitized once here, with a trailing '/', so url() is a plain string concatenation.
+        # Keeps protocol roots such as 'memory://' or 's3://' (bucket as namespace) intact.
+        base = sanitize_url(base_url)
+        self._base = base if base.endswith('/') else base + '/'
         self.namespace_url = self.url(self.namespace)
-        self.headers = headers
-        self.extra_args = extra_args
+        self._is_http = self.namespace_url.startswith(('http://', 'https://'))
+        self.headers = dict(headers)
+        self.package_hash = self.headers.get('X-hash') or self.headers.get('x-hash')
+        self._fs = None
+        self._package_files = None
+        self._source_cache = {}
+        self._exists_cache = {}
 
     @property
-    def package_name(self):
-        return self.namespace
+    def fs(self):
+        # Build the filesystem once, so its (HTTP) session is reused across imports
+        if self._fs is None:
+            # fsspec is heavy (protocol registry, aiohttp, ...), import it only when needed
+            import fsspec
+
+            extra_args = self.extra_args
+            if self._is_http:
+                # send the headers on every request of the underlying aiohttp session
+                client_kwargs = extra_args.get("client_kwargs", {})
+                client_headers = {**self.headers, **client_kwargs.get("headers", {})}
+                extra_args = {**extra_args, "client_kwargs": {**client_kwargs, "headers": client_headers}}
+            self._fs, _ = fsspec.core.url_to_fs(self.namespace_url, **extra_args)
+        return self._fs
+
+    def _get_package_files(self):
+        # Listing a remote folder is expensive (one or more requests per call),
+        # so it is done only once per importer. Use reload=True to refresh it.
+        if self._package_files is None:
+            url = self.namespace_url
+            fs = self.fs
+            # We need to use "fs.find()" to have a recursive list of files
+            # But I am having issues with fs.find(), because it was not listing the current dir,
+            # only the children dirs. Workaround: find() + ls() covers everything
+            package_files = set(fs.find(url) + fs.ls(url, detail=False))
+            # add the folders too, so modules without __init__.py are found in the listing
+            root = self._path(url)
+            package_files.add(root)
+            for path in list(package_files):
+                while len(path) > len(root):
+                    path = posixpath.dirname(path)
+                    package_files.add(path)
+            self._package_files = package_files
+        return self._package_files
+
+    def _path(self, url):
+        # Most filesystems (s3, github, memory, ...) list and key files without the protocol,
+        # the listing and the source cache use this form so they can be compared with URLs.
+        return self.fs._strip_protocol(url)
+
+    def _exists(self, url):
+        # When the namespace was already listed (prefetch), use it. Otherwise probe
+        # only the requested url, which is cheaper than listing the whole tree.
+        if self._package_files is not None:
+            return self._path(url) in self._package_files
+        if url not in self._exists_cache:
+            self._exists_cache[url] = self.fs.exists(url)
+        return self._exists_cache[url]
+
+    def _prefetch_sources(self):
+        # Download every .py file of the namespace in a single (concurrent) batch,
+        # instead of one request per imported module.
+        py_urls = [url for url in self._get_package_files() if url.endswith('.py')]
+        if not py_urls:
+            return self._source_cache
+        try:
+            if self._is_http and self.backend == "obstore":
+                sources = self._download_many_obstore(py_urls)
+            else:
+                sources = self.fs.cat(py_urls)
+        except Exception as e:
+            # Not fatal: the modules will be fetched one by one when imported
+            logger.warning(f"Prefetch failed for {self.namespace_url}. Error: {e}")
+        else:
+            self._source_cache = {self._path(url): data.decode() for url, data in sources.items()}
+        return self._source_cache
 
-    @property
-    def package_hash(self):
-        return self.headers.get('X-hash') or self.headers.get('x-hash')
+    def _download_many_obstore(self, urls):
+        # obstore (Rust) releases the GIL while downloading, so plain threads run in parallel
+        from concurrent.futures import ThreadPoolExecutor
 
-    @property
-    def fs(self):
-        _fs, _ = fsspec.core.url_to_fs(self.namespace_url, **self.extra_args)
-        return _fs
+        import obstore
+        from obstore.store import HTTPStore
 
-    @property
-    def package_files(self):
-        url = self.namespace_url
-        fs = self.fs
-        # We need to use "fs.find()" to have a recursive list of files
-        # But I am having issues with fs.find(), because it was not listing the current dir,
-        # only the children dirs. Workaround: find() + ls() covers everything
-        package_files = set(fs.find(url) + fs.ls(url, detail=False))
-        return package_files
+        client_options = {}
+        if self.headers:
+            client_options["default_headers"] = self.headers
+        if self._base.startswith('http://'):
+            # obstore refuses plain http unless explicitly allowed
+            client_options["allow_http"] = True
+        store = HTTPStore.from_url(self._base, client_options=client_options or None)
+        prefix = len(self._base)
+
+        def download(url):
+            return url, bytes(obstore.get(store, url[prefix:]).bytes())
+
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            return dict(executor.map(download, urls))
 
     def url(self, full_name):
-        module_path = full_name.replace('.', '/')
-        url = f"{self.base_url}/{os.path.normpath(module_path)}"
-        url = sanitize_url(url)
-        return url
+        # Do not use os.path here: on Windows it would turn the URL separators into backslashes
+        return self._base + full_name.replace('.', '/')
 
     def add_header(self, key: str, value: str) -> dict:
-        self.__headers[key] = value
-        return self.__headers
+        self.headers[key] = value
+        if key.lower() == 'x-hash':
+            self.package_hash = self.headers.get('X-hash') or self.headers.get('x-hash')
+        # the headers are set when the filesystem (HTTP session) is built
+        self._fs = None
+        return self.headers
+
+    def _cat_http(self, url):
+        # Conditional GET: when the file did not change since the last download
+        # the server answers 304 (no body) and the cached source is used.
+        # Sources downloaded by a prefetch do not go through here, so they have no ETag.
+        from ._async_http import conditional_get
+
+        etag, source = self._etag_cache.get(url, (None, None))
+        data, etag = conditional_get(self.fs, url, etag)
+        if data is None:
+            return source
+        source = data.decode()
+        if etag:
+            self._etag_cache[url] = (etag, source)
+        return source
 
     def _get_raw_source_code(self, url):
+        path = self._path(url)
+        if path in self._source_cache:
+            return self._source_cache[path]
         try:
-            response = self.fs.cat(url).decode()
+            if self._is_http:
+                response = self._cat_http(url)
+            else:
+                response = self.fs.cat(url).decode()
+        except FileNotFoundError:
+            logger.debug(f"File not found. URL: {url}")
+            raise ModuleNotFoundError(f"File not found. URL: {url}") from None
         except Exception as e:
             # any other error is a fail to import
             # the import subsystem will handle 'ModuleNotFoundError'
-            error_msg = f"File request failed. URL: {url}. Error: {e}, "
-            error_msg += f"stack: {traceback.format_tb(e.__traceback__)}"
+            error_msg = f"File request failed. URL: {url}. Error: {e}"
+            if logger.isEnabledFor(logging.DEBUG):
+                import traceback
+
+                error_msg += f", stack: {traceback.format_tb(e.__traceback__)}"
             logger.critical(error_msg)
             raise ModuleNotFoundError(error_msg)
         else:
-            # If no suffix, means folder and no __init__.py neither __main__.
-            # which means source_code is empty for this module
-            # raw_source_code = "" if suffix == "" else response
-            raw_source_code = response
-            return raw_source_code
+            return response
 
     def find_spec(self, full_name, path, target):
         logger.debug(f"Searching module full_name={full_name}, path={path}, target={target}")
@@ -114,7 +245,7 @@ class RemoteImporter(MetaPathFinder, LazyLoader):
         # keep searching (with the remaining finders in sys.meta_path) until some finder claims
         # ownership of that full_name, or until the subsystem returns ModuleNotFound
 
-        package_name, *_ = full_name.split('.')
+        package_name = full_name.partition('.')[0]
         if package_name != self.namespace:
             logger.debug(
                 f"{self.package_name} not found in {self.namespace} namespace ({self.url(full_name)}). "
@@ -142,25 +273,26 @@ class RemoteImporter(MetaPathFinder, LazyLoader):
         # https://stackoverflow.com/questions/16245106/python-import-class-with-same-name-as-directory
 
         this_module_url = self.url(full_name)
-        url_init = sanitize_url(f"{this_module_url}/__init__.py")
-        url_py = sanitize_url(f"{this_module_url}.py")
-        if url_init in self.package_files:
+        url_init = this_module_url + "/__init__.py"
+        url_py = this_module_url + ".py"
+        # Only check that the module exists: the source is downloaded in exec_module(),
+        # so a spec that is never executed costs no download.
+        if self._exists(url_init):
             url = url_init
-            logger.info(f"Loading module {full_name} {url}")
-            raw_source_code = self._get_raw_source_code(url=url)
-        elif url_py in self.package_files:
+        elif self._exists(url_py):
             url = url_py
-            logger.info(f"Loading module {full_name} {url}")
-            raw_source_code = self._get_raw_source_code(url=url)
+        elif self._exists(this_module_url):
+            # Folder without a __init__.py: the module is empty
+            url = None
+            logger.debug(f"Folder without a __init__.py {full_name} {this_module_url}")
         else:
-            url = this_module_url
-            logger.debug(f"Folder without a __init__.py? {full_name} {url}")
-            raw_source_code = ''
+            logger.debug(f"{full_name} not found in {this_module_url}. Moving on to next finder.")
+            return None
 
-        logger.info(f"Lodule loaded {full_name} {url}")
-        self._full_url = url
-        self._raw_source_code = raw_source_code
-        return ModuleSpec(full_name, self)
+        logger.info(f"Module found {full_name} {url or this_module_url}")
+        spec = ModuleSpec(full_name, self)
+        spec.loader_state = {"url": url}
+        return spec
 
     def create_module(self, spec):
         module = types.ModuleType(spec.name)
@@ -172,11 +304,52 @@ class RemoteImporter(MetaPathFinder, LazyLoader):
         return module
 
     def exec_module(self, module):
-        module.__source__ = self._raw_source_code
-        self.compiled_source = compile(source=self._raw_source_code, filename=self.base_url, mode='exec')
-        exec(self.compiled_source, module.__dict__)
+        # Everything about this module is kept in locals: exec() runs the imports of the
+        # module, which call exec_module() again on this same importer.
+        url = module.__spec__.loader_state["url"]
+        if url is None:
+            # If no suffix, means folder and no __init__.py neither __main__.
+            # which means source_code is empty for this module
+            url = module.__url__
+            raw_source_code = ''
+        else:
+            logger.info(f"Loading module {module.__name__} {url}")
+            raw_source_code = self._get_raw_source_code(url=url)
+        module.__source__ = raw_source_code
+        module.__source_hash__ = hash(raw_source_code)
+        source, code = self._code_cache.get(url, (None, None))
+        if source != raw_source_code:
+            code = compile(source=raw_source_code, filename=self.base_url, mode='exec')
+            self._code_cache[url] = (raw_source_code, code)
+        exec(code, module.__dict__)
+        self._loaded_modules.setdefault(module.__name__)
         return module
 
+    def _source_changed(self, module):
+        spec = self.find_spec(module.__name__, None, None)
+        if spec is None:
+            # removed from the remote location, the reload will report it
+            return True
+        url = spec.loader_state["url"]
+        if url is None:
+            source = ''
+        else:
+            source = self._get_raw_source_code(url=url)
+            # keep it, so the reload does not download it again
+            self._source_cache[self._path(url)] = source
+        return getattr(module, '__source_hash__', None) != hash(source)
+
+    def _reload(self):
+        modules = [sys.modules[name] for name in self._loaded_modules if name in sys.modules]
+        self._loaded_modules = {module.__name__: None for module in modules}
+        # A module must be executed again when one of its dependencies changed, even if its own
+        # source did not (e.g. "from ns.b import VALUE"). So either everything is reloaded, or nothing.
+        if not any(self._source_changed(module) for module in modules):
+            logger.debug(f"Namespace {self.namespace} unchanged, nothing to reload")
+            return
+        for module in modules:
+            importlib.reload(module)
+
     @classmethod
     def add_remote(
         cls,
@@ -186,6 +359,8 @@ class RemoteImporter(MetaPathFinder, LazyLoader):
         headers: dict = {},
         extra_args: dict = {},
         test_connection: bool = False,
+        prefetch: bool = False,
+        backend: str = "fsspec",
     ):
 
         if not isinstance(namespaces, (tuple, list)):
@@ -193,6 +368,8 @@ class RemoteImporter(MetaPathFinder, LazyLoader):
 
         for namespace in namespaces:
             if test_connection:
+                import fsspec
+
                 url = sanitize_url(f"{base_url}/{namespace}")
                 fs, _ = fsspec.core.url_to_fs(url, **extra_args)
                 if fs.exists(url):
@@ -203,22 +380,53 @@ class RemoteImporter(MetaPathFinder, LazyLoader):
                     logger.critical(msg)
                     raise ModuleNotFoundError(msg)
 
-            for importer in [i for i in sys.meta_path if isinstance(i, RemoteImporter)]:
-                if namespace == importer.namespace:
-                    if reload:
-                        importer.__headers = headers
-                        importer.__base_url = base_url
-                        for module in [m for m in sys.modules if namespace in m]:
-                            logger.debug(f"Updating importer - headers: {headers}, base_url: {base_url}")
-                            importlib.reload(sys.modules[module])
-                    else:
-                        logger.warning(
-                            f"Namespace {namespace} already imported."
-                            "Use reload=True if you want to force reload."
-                        )
-                    return importer
-            # IMPORTANT: must be added to the first item
-            # because some finder along the lines mess up with "lib" keyword.
-            importer = cls(namespace, base_url, headers=headers, extra_args=extra_args)
-            sys.meta_path.insert(0, importer)
+            registry = RemoteImporterRegistry.install()
+            importer = registry.importers.get(namespace)
+            if importer is not None:
+                if reload:
+                    logger.debug(f"Updating importer - headers: {headers}, base_url: {base_url}")
+                    importer._reset(base_url, headers)
+                    if importer.prefetch:
+                        importer._prefetch_sources()
+                    importer._reload()
+                else:
+                    logger.warning(
+                        f"Namespace {namespace} already imported."
+                        "Use reload=True if you want to force reload."
+                    )
+                return importer
+            importer = cls(
+                namespace, base_url, headers=headers, extra_args=extra_args, prefetch=prefetch, backend=backend
+            )
+            if prefetch:
+                importer._prefetch_sources()
+            registry.importers[namespace] = importer
         return importer
+
+
+class RemoteImporterRegistry(MetaPathFinder):
+    """Single finder in sys.meta_path for all the remote namespaces.
+
+    Dispatches find_spec(...) to the RemoteImporter of the top level package with one
+    dict lookup, instead of asking every RemoteImporter in turn.
+    """
+
+    def __init__(self):
+        self.importers: Dict[str, RemoteImporter] = {}
+
+    @classmethod
+    def install(cls):
+        for finder in sys.meta_path:
+            if isinstance(finder, cls):
+                return finder
+        registry = cls()
+        # IMPORTANT: must be added to the first item
+        # because some finder along the lines mess up with "lib" keyword.
+        sys.meta_path.insert(0, registry)
+        return registry
+
+    def find_spec(self, full_name, path, target=None):
+        importer = self.importers.get(full_name.partition('.')[0])
+        if importer is None:
+            return None
+        return importer.find_spec(full_name, path, target)
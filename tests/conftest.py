@@ -0,0 +1,68 @@
+import hashlib
+import http.server
+import threading
+from pathlib import Path
+
+import pytest
+
+EXAMPLES = Path(__file__).absolute().parent.parent / "examples"
+
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+    """Serve the examples folder, with ETag support, and record the requests."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=str(EXAMPLES), **kwargs)
+
+    def _record(self):
+        headers = {key.lower(): value for key, value in self.headers.items()}
+        self.server.requests.append((self.command, self.path, headers))
+
+    def do_GET(self):
+        self._record()
+        path = Path(self.translate_path(self.path))
+        self._etag = None
+        if path.is_file():
+            self._etag = '"%s"' % hashlib.md5(path.read_bytes()).hexdigest()
+            if self.headers.get("If-None-Match") == self._etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+        super().do_GET()
+
+    def do_HEAD(self):
+        self._record()
+        self._etag = None
+        super().do_HEAD()
+
+    def end_headers(self):
+        if self._etag:
+            self.send_header("ETag", self._etag)
+        super().end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def http_package(http_server):
+    """Base URL of the examples folder, the test_package namespace is removed afterwards."""
+    import sys
+
+    from remote_import import RemoteImporterRegistry
+
+    yield f"http://127.0.0.1:{http_server.server_port}"
+    RemoteImporterRegistry.install().importers.pop("test_package", None)
+    for name in [m for m in sys.modules if m == "test_package" or m.startswith("test_package.")]:
+        del sys.modules[name]
@@ -0,0 +1,179 @@
+import sys
+
+import fsspec
+import pytest
+
+from remote_import import RemoteImporter, RemoteImporterRegistry
+
+
+@pytest.fixture
+def memory_package():
+    fs = fsspec.filesystem("memory")
+    fs.pipe("memory://pkgs/ns_memory/a.py", b"X = 1\n")
+    fs.pipe("memory://pkgs/ns_memory/sub/b.py", b"Y = 2\n")
+    yield "memory://pkgs"
+    importers = RemoteImporterRegistry.install().importers
+    for namespace in [n for n in importers if n.startswith("ns_")]:
+        del importers[namespace]
+    for name in [m for m in sys.modules if m.startswith("ns_")]:
+        del sys.modules[name]
+    for root in ("memory://pkgs", "memory://pkgs_other"):
+        if fs.exists(root):
+            fs.rm(root, recursive=True)
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_memory_filesystem(memory_package, prefetch):
+    importer = RemoteImporter.add_remote(["ns_memory"], memory_package, prefetch=prefetch)
+    if prefetch:
+        assert len(importer._source_cache) == 2
+
+    from ns_memory.a import X
+    from ns_memory.sub.b import Y
+
+    assert (X, Y) == (1, 2)
+
+
+def test_reload_updates_dependent_modules(memory_package):
+    fs = fsspec.filesystem("memory")
+    fs.pipe("memory://pkgs/ns_memory/c.py", b"from ns_memory.d import VALUE\n")
+    fs.pipe("memory://pkgs/ns_memory/d.py", b"VALUE = 1\n")
+    RemoteImporter.add_remote(["ns_memory"], memory_package)
+    import ns_memory.c
+
+    fs.pipe("memory://pkgs/ns_memory/d.py", b"VALUE = 2\n")
+    RemoteImporter.add_remote(["ns_memory"], memory_package, reload=True)
+
+    assert sys.modules["ns_memory.d"].VALUE == 2
+    assert ns_memory.c.VALUE == 2
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_missing_module(memory_package, prefetch):
+    RemoteImporter.add_remote(["ns_memory"], memory_package, prefetch=prefetch)
+    import ns_memory.sub
+
+    assert ns_memory.sub.__source__ == ""
+    with pytest.raises(ModuleNotFoundError):
+        import ns_memory.nonexistent  # noqa: F401
+
+
+def test_reload_unchanged_namespace_is_not_executed(memory_package):
+    fs = fsspec.filesystem("memory")
+    fs.pipe(
+        "memory://pkgs/ns_memory/c.py",
+        b"import ns_memory.d\nCOUNT = globals().get('COUNT', 0) + 1\n",
+    )
+    fs.pipe("memory://pkgs/ns_memory/d.py", b"VALUE = 1\n")
+    RemoteImporter.add_remote(["ns_memory"], memory_package)
+    import ns_memory.c
+
+    assert ns_memory.c.__source_hash__ == hash(ns_memory.c.__source__)
+    RemoteImporter.add_remote(["ns_memory"], memory_package, reload=True)
+
+    assert ns_memory.c.COUNT == 1
+
+
+def test_obstore_prefetch(http_server, http_package):
+    pytest.importorskip("obstore")
+    importer = RemoteImporter.add_remote(
+        ["test_package"], http_package, prefetch=True, backend="obstore", headers={"X-hash": "1"}
+    )
+    assert len(importer._source_cache) == 4
+    assert all(headers.get("x-hash") == "1" for _, path, headers in http_server.requests if path.endswith(".py"))
+
+    from test_package.c.sub_c import value
+
+    assert value == pytest.approx(3.141592653589793)
+
+
+def test_headers_are_sent(http_server, http_package):
+    importer = RemoteImporter.add_remote(["test_package"], http_package, headers={"X-hash": "v1"})
+    import test_package.b  # noqa: F401
+
+    importer.add_header("X-hash", "v2")
+    import test_package.d.aclass  # noqa: F401
+
+    sent = {path: headers.get("x-hash") for _, path, headers in http_server.requests}
+    assert sent["/test_package/b.py"] == "v1"
+    assert sent["/test_package/d/aclass.py"] == "v2"
+
+
+@pytest.mark.parametrize(
+    "base_url, namespace_url",
+    [
+        ("http://0.0.0.0:7777/examples", "http://0.0.0.0:7777/examples/ns"),
+        ("http://0.0.0.0:7777/examples/", "http://0.0.0.0:7777/examples/ns"),
+        ("http://0.0.0.0:7777//examples//", "http://0.0.0.0:7777/examples/ns"),
+        ("memory://", "memory://ns"),
+        ("s3://", "s3://ns"),
+    ],
+)
+def test_namespace_url(base_url, namespace_url):
+    importer = RemoteImporter("ns", base_url)
+    assert importer.namespace_url == namespace_url
+    assert importer.url("ns.a.b") == namespace_url + "/a/b"
+
+
+def test_etag_conditional_get(http_server, http_package):
+    importer = RemoteImporter.add_remote(["test_package"], http_package)
+    import test_package.b  # noqa: F401
+
+    url = http_package + "/test_package/b.py"
+    etag, source = importer._etag_cache[url]
+    assert etag and source == test_package.b.__source__
+
+    # unchanged file: the server answers 304 and the cached source is used
+    assert importer._get_raw_source_code(url) == source
+    method, path, headers = http_server.requests[-1]
+    assert (method, path, headers.get("if-none-match")) == ("GET", "/test_package/b.py", etag)
+
+
+def test_registry_dispatches_namespaces(memory_package):
+    fs = fsspec.filesystem("memory")
+    fs.pipe("memory://pkgs/ns_other/a.py", b"X = 'other'\n")
+    RemoteImporter.add_remote(["ns_memory", "ns_other"], memory_package)
+
+    registries = [f for f in sys.meta_path if isinstance(f, RemoteImporterRegistry)]
+    assert len(registries) == 1
+    assert sorted(n for n in registries[0].importers if n.startswith("ns_")) == ["ns_memory", "ns_other"]
+    assert registries[0].find_spec("json", None) is None
+
+    import ns_memory.a
+    import ns_other.a
+
+    assert (ns_memory.a.X, ns_other.a.X) == (1, "other")
+
+
+def test_reload_updates_base_url_and_headers(memory_package):
+    fs = fsspec.filesystem("memory")
+    fs.pipe("memory://pkgs_other/ns_memory/a.py", b"X = 'other'\n")
+    importer = RemoteImporter.add_remote(["ns_memory"], memory_package, headers={"X-hash": "1"})
+    import ns_memory.a
+
+    RemoteImporter.add_remote(["ns_memory"], "memory://pkgs_other", reload=True, headers={"X-hash": "2"})
+
+    assert importer.base_url == "memory://pkgs_other"
+    assert importer.headers == {"X-hash": "2"}
+    assert importer.package_hash == "2"
+    assert list(importer._loaded_modules) == ["ns_memory", "ns_memory.a"]
+    assert ns_memory.a.X == "other"
+
+
+def test_code_cache_reused_on_reload(memory_package):
+    fs = fsspec.filesystem("memory")
+    fs.pipe("memory://pkgs/ns_memory/c.py", b"from ns_memory.d import VALUE\n")
+    fs.pipe("memory://pkgs/ns_memory/d.py", b"VALUE = 1\n")
+    RemoteImporter.add_remote(["ns_memory"], memory_package)
+    import ns_memory.c  # noqa: F401
+
+    _, code_c = RemoteImporter._code_cache["memory://pkgs/ns_memory/c.py"]
+    _, code_d = RemoteImporter._code_cache["memory://pkgs/ns_memory/d.py"]
+    fs.pipe("memory://pkgs/ns_memory/d.py", b"VALUE = 2\n")
+    RemoteImporter.add_remote(["ns_memory"], memory_package, reload=True)
+
+    # c is executed again (d changed) but its source did not change: it is not compiled again
+    assert RemoteImporter._code_cache["memory://pkgs/ns_memory/c.py"][1] is code_c
+    # only the latest version of d is kept
+    source_d, new_code_d = RemoteImporter._code_cache["memory://pkgs/ns_memory/d.py"]
+    assert (source_d, new_code_d is code_d) == ("VALUE = 2\n", False)